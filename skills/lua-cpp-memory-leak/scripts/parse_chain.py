@@ -5,7 +5,11 @@ Reference Chain Parser for Lua-C++ Memory Leak Analysis
 Parses reference chain strings into structured data for easier analysis.
 
 Usage:
-    python parse_chain.py <reference_chain>
+    python parse_chain.py [--compact] [--no-viz] <reference_chain> [<chain2>] ...
+
+Options:
+    --compact    Emit single-line JSON (for piping into other tools)
+    --no-viz     Skip building the visualization tree
 
 Example:
     python parse_chain.py "IVShopItemTemplate:000000029E8DD9C0[true]._nameComp.IVTextQualityComponent:000000029E8D6300[false].__cppinst = WBP_MyWidget_C"
@@ -16,26 +20,79 @@ Output:
 
 import sys
 import re
+import string
 import json
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Tuple
+
+
+# Trailing C++ instance marker: .__cppinst = BlueprintClassName
+_CPP_MARKER = '.__cppinst'
+# Allowed characters for the blueprint class name
+_NAME_CHARS = frozenset(string.ascii_letters + string.digits + '_')
+# Pattern: ClassName:HexAddress[bool]
+_NODE_RE = re.compile(r'^([A-Za-z0-9_]+):([0-9A-Fa-f]+)\[(true|false)\]$')
+
+
+def _parse_chain_fast(chain_str: str) -> Tuple[List[Tuple[str, str, bool, Optional[str]]], Optional[str]]:
+    """
+    Split a reference chain into (class_name, address, released, field) tuples.
+    
+    Pure string/tuple code with no node objects, so it also runs under PyPy.
+    Returns the node tuples and the __cppinst blueprint name.
+    """
+    # First, extract __cppinst suffix if present; it is always the last segment
+    # Pattern: .__cppinst = BlueprintClassName
+    cpp_instance = None
+    idx = chain_str.rfind(_CPP_MARKER)
+    if idx >= 0:
+        tail = chain_str[idx + len(_CPP_MARKER):].lstrip()
+        name = tail[1:].lstrip() if tail.startswith('=') else ''
+        if name.endswith('\n'):
+            # Match the old regex '$', which allowed one trailing newline
+            name = name[:-1]
+        if name and _NAME_CHARS.issuperset(name):
+            cpp_instance = name
+            # Remove the __cppinst part for parsing
+            chain_str = chain_str[:idx]
+    
+    # Pattern: ClassName:Address[true/false]
+    # Connected by .fieldName.
+    nodes = []
+    current_field = None
+    node_match = _NODE_RE.match
+    for part in chain_str.split('.'):
+        # Check if this part contains a class definition
+        class_match = node_match(part)
+        
+        if class_match:
+            class_name, address, flag = class_match.groups()
+            nodes.append((class_name, address, flag == 'true', current_field))
+            current_field = None
+        elif part and not part.startswith('__cppinst'):
+            # This is a field name (skip malformed __cppinst segments)
+            current_field = part
+    
+    return nodes, cpp_instance
 
 
 class ReferenceNode:
     """Represents a single node in the reference chain."""
     
+    __slots__ = ("class_name", "address", "released", "field", "index")
+    
     def __init__(self, class_name: str, address: str, released: bool, field: Optional[str] = None):
         self.class_name = class_name
         self.address = address
         self.released = released
         self.field = field  # Field name from parent to this node
+        self.index: int = -1  # Position in the owning chain, set on parse
         
     def to_dict(self) -> Dict:
         return {
             "class_name": self.class_name,
             "address": self.address,
             "released": self.released,
-            "field": self.field,
-            "is_leak": not self.released
+            "field": self.field
         }
     
     def __repr__(self):
@@ -47,49 +104,24 @@ class ReferenceNode:
 class ReferenceChain:
     """Represents a complete reference chain."""
     
+    __slots__ = ("raw_chain", "nodes", "cpp_instance", "_viz")
+    
     def __init__(self, chain_str: str):
         self.raw_chain = chain_str
         self.nodes: List[ReferenceNode] = []
         self.cpp_instance: Optional[str] = None  # C++ blueprint class name
+        # Cached visualization; nodes are not mutated after parse()
+        self._viz: Optional[str] = None
         self.parse()
         
     def parse(self):
         """Parse the reference chain string into nodes."""
-        # First, extract __cppinst suffix if present
-        # Pattern: .__cppinst = BlueprintClassName
-        cpp_match = re.search(r'\.__cppinst\s*=\s*([A-Za-z0-9_]+)$', self.raw_chain)
-        
-        chain_to_parse = self.raw_chain
-        if cpp_match:
-            self.cpp_instance = cpp_match.group(1)
-            # Remove the __cppinst part for parsing
-            chain_to_parse = self.raw_chain[:cpp_match.start()]
+        parsed, self.cpp_instance = _parse_chain_fast(self.raw_chain)
         
-        # Pattern: ClassName:Address[true/false]
-        # Connected by .fieldName.
-        
-        parts = chain_to_parse.split('.')
-        
-        current_field = None
-        for i, part in enumerate(parts):
-            # Extract class name, address, and release status
-            # Pattern: ClassName:HexAddress[bool] or just fieldName
-            
-            # Check if this part contains a class definition
-            class_match = re.match(r'^([A-Za-z0-9_]+):([0-9A-Fa-f]+)\[(true|false)\]$', part)
-            
-            if class_match:
-                class_name = class_match.group(1)
-                address = class_match.group(2)
-                released = class_match.group(3) == 'true'
-                
-                node = ReferenceNode(class_name, address, released, current_field)
-                self.nodes.append(node)
-                current_field = None
-            else:
-                # This is a field name (skip __cppinst as it's handled above)
-                if part and not part.startswith('__cppinst'):
-                    current_field = part
+        for class_name, address, released, field in parsed:
+            node = ReferenceNode(class_name, address, released, field)
+            node.index = len(self.nodes)
+            self.nodes.append(node)
                 
     def get_leak_nodes(self) -> List[ReferenceNode]:
         """Return all nodes that have not called Release."""
@@ -102,120 +134,140 @@ class ReferenceChain:
     
     def get_parent(self, node: ReferenceNode) -> Optional[ReferenceNode]:
         """Get the parent node of a given node."""
-        try:
-            idx = self.nodes.index(node)
-            return self.nodes[idx - 1] if idx > 0 else None
-        except ValueError:
+        if not self._owns(node):
             return None
+        return self.nodes[node.index - 1] if node.index > 0 else None
     
     def get_children(self, node: ReferenceNode) -> List[ReferenceNode]:
         """Get all child nodes of a given node."""
-        try:
-            idx = self.nodes.index(node)
-            return self.nodes[idx + 1:]
-        except ValueError:
+        if not self._owns(node):
             return []
+        return self.nodes[node.index + 1:]
+    
+    def _owns(self, node: ReferenceNode) -> bool:
+        """Check in O(1) that a node belongs to this chain."""
+        i = node.index
+        return 0 <= i < len(self.nodes) and self.nodes[i] is node
     
     def visualize(self) -> str:
         """Create a visual tree representation of the chain."""
+        if self._viz is not None:
+            return self._viz
+        
         lines = []
+        indent = ""  # Grows by one level per node
         for i, node in enumerate(self.nodes):
-            indent = "  " * i
+            parts = [indent]
             if i > 0:
-                indent += "└─ "
+                parts.append("└─ ")
                 if node.field:
-                    indent += f"{node.field} → "
+                    parts.append(node.field)
+                    parts.append(" → ")
             
             status = "Released ✓" if node.released else "NOT RELEASED ⚠️"
-            lines.append(f"{indent}{node.class_name} [{status}]")
+            lines.append(f"{''.join(parts)}{node.class_name} [{status}]")
+            indent += "  "
         
         # Add C++ instance info if present
         if self.cpp_instance:
-            last_indent = "  " * len(self.nodes)
-            lines.append(f"{last_indent}└─ __cppinst → {self.cpp_instance} (C++ Blueprint)")
+            lines.append(f"{indent}└─ __cppinst → {self.cpp_instance} (C++ Blueprint)")
         
-        return "\n".join(lines)
+        self._viz = "\n".join(lines)
+        return self._viz
     
-    def analyze(self) -> Dict:
-        """Perform analysis and return structured results."""
-        leak_nodes = self.get_leak_nodes()
-        first_leak = self.get_first_leak()
+    def analyze(self, include_visualization: bool = True) -> Dict:
+        """
+        Perform analysis and return structured results.
         
-        analysis = {
-            "raw_chain": self.raw_chain,
-            "total_nodes": len(self.nodes),
-            "leaked_nodes": len(leak_nodes),
-            "cpp_instance": self.cpp_instance,
-            "nodes": [node.to_dict() for node in self.nodes],
-            "visualization": self.visualize(),
-            "leaks": []
-        }
+        Set include_visualization=False to skip the tree string when the
+        output is consumed by tooling; "visualization" is then None.
+        """
+        total = len(self.nodes)
+        node_dicts = []
+        leaks = []
         
-        # Analyze each leak
-        for leak_node in leak_nodes:
-            parent = self.get_parent(leak_node)
-            children = self.get_children(leak_node)
+        # Single pass: emit node dicts and analyze each leak as it is reached;
+        # leak entries reference the same dict objects as the nodes list
+        prev_node = None
+        prev_dict = None
+        for i, node in enumerate(self.nodes):
+            d = node.to_dict()
+            node_dicts.append(d)
             
-            leak_info = {
-                "node": leak_node.to_dict(),
-                "parent": parent.to_dict() if parent else None,
-                "parent_released": parent.released if parent else None,
-                "has_children": len(children) > 0,
-                "children_count": len(children),
-                "priority": "high" if parent and parent.released else "medium",
-                "cpp_blueprint": self.cpp_instance if leak_node == self.nodes[-1] else None
-            }
+            if not node.released:
+                children_count = total - i - 1
+                parent_released = prev_node.released if prev_node else None
+                leaks.append({
+                    "node": d,
+                    "parent": prev_dict,
+                    "parent_released": parent_released,
+                    "has_children": children_count > 0,
+                    "children_count": children_count,
+                    "priority": "high" if parent_released else "medium",
+                    "cpp_blueprint": self.cpp_instance if children_count == 0 else None
+                })
             
-            analysis["leaks"].append(leak_info)
+            prev_node = node
+            prev_dict = d
         
-        return analysis
+        return {
+            "raw_chain": self.raw_chain,
+            "total_nodes": total,
+            "leaked_nodes": len(leaks),
+            "cpp_instance": self.cpp_instance,
+            "nodes": node_dicts,
+            "visualization": self.visualize() if include_visualization else None,
+            "leaks": leaks
+        }
     
-    def to_dict(self) -> Dict:
-        """Convert entire chain to dictionary."""
-        return self.analyze()
+    # Convert entire chain to dictionary
+    to_dict = analyze
 
 
-def parse_multiple_chains(chain_strings: List[str]) -> Dict:
+def parse_multiple_chains(chain_strings: List[str], include_visualization: bool = True) -> Dict:
     """Parse multiple reference chains and provide consolidated analysis."""
-    chains = [ReferenceChain(chain_str) for chain_str in chain_strings]
+    analyses = [ReferenceChain(chain_str).analyze(include_visualization) for chain_str in chain_strings]
     
-    all_leaked_classes = set()
-    all_cpp_instances = set()
-    
-    for chain in chains:
-        for leak in chain.get_leak_nodes():
-            all_leaked_classes.add(leak.class_name)
-        if chain.cpp_instance:
-            all_cpp_instances.add(chain.cpp_instance)
+    # Derive the consolidated view from the per-chain analyses
+    all_leaked_classes = {leak["node"]["class_name"] for analysis in analyses for leak in analysis["leaks"]}
+    all_cpp_instances = {analysis["cpp_instance"] for analysis in analyses if analysis["cpp_instance"]}
     
     result = {
-        "total_chains": len(chains),
+        "total_chains": len(analyses),
         "unique_leaked_classes": list(all_leaked_classes),
         "unique_cpp_blueprints": list(all_cpp_instances),
-        "chains": [chain.to_dict() for chain in chains]
+        "chains": analyses
     }
     
     return result
 
 
 def main():
-    if len(sys.argv) < 2:
-        print("Usage: python parse_chain.py <reference_chain> [<chain2>] [<chain3>] ...")
+    options = {"--compact", "--no-viz"}
+    compact = "--compact" in sys.argv[1:]
+    include_visualization = "--no-viz" not in sys.argv[1:]
+    chain_strings = [arg for arg in sys.argv[1:] if arg not in options]
+    
+    if not chain_strings:
+        print("Usage: python parse_chain.py [--compact] [--no-viz] <reference_chain> [<chain2>] [<chain3>] ...")
         print("\nExample:")
         print('  python parse_chain.py "IVShopItemTemplate:000000029E8DD9C0[true]._nameComp.IVTextQualityComponent:000000029E8D6300[false].__cppinst = WBP_MyWidget_C"')
         sys.exit(1)
     
-    chain_strings = sys.argv[1:]
-    
     if len(chain_strings) == 1:
         # Single chain analysis
         chain = ReferenceChain(chain_strings[0])
-        result = chain.to_dict()
+        result = chain.to_dict(include_visualization)
     else:
         # Multiple chain analysis
-        result = parse_multiple_chains(chain_strings)
+        result = parse_multiple_chains(chain_strings, include_visualization)
     
-    print(json.dumps(result, indent=2))
+    # Stream straight to stdout instead of building the whole string first
+    if compact:
+        json.dump(result, sys.stdout, separators=(',', ':'))
+    else:
+        json.dump(result, sys.stdout, indent=2, separators=(',', ': '))
+    sys.stdout.write('\n')
 
 
 if __name__ == "__main__":
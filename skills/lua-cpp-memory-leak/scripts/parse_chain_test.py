@@ -0,0 +1,151 @@
+import re
+import unittest
+from parse_chain import ReferenceChain
+
+
+# Original parser, kept as the reference the current implementation must match.
+_REF_CPP_RE = re.compile(r'\.__cppinst\s*=\s*([A-Za-z0-9_]+)$')
+_REF_NODE_RE = re.compile(r'^([A-Za-z0-9_]+):([0-9A-Fa-f]+)\[(true|false)\]$')
+
+
+def reference_parse(chain_str):
+    cpp_instance = None
+    cpp_match = _REF_CPP_RE.search(chain_str)
+    if cpp_match:
+        cpp_instance = cpp_match.group(1)
+        chain_str = chain_str[:cpp_match.start()]
+
+    nodes = []
+    current_field = None
+    for part in chain_str.split('.'):
+        class_match = _REF_NODE_RE.match(part)
+        if class_match:
+            nodes.append((class_match.group(1), class_match.group(2),
+                          class_match.group(3) == 'true', current_field))
+            current_field = None
+        elif part and not part.startswith('__cppinst'):
+            current_field = part
+    return nodes, cpp_instance
+
+
+# Currently this is not run automatically in CI; it's just for documentation and manual checking.
+class TestParseMatchesReference(unittest.TestCase):
+
+    def assert_matches_reference(self, chain_str):
+        chain = ReferenceChain(chain_str)
+        nodes = [(n.class_name, n.address, n.released, n.field) for n in chain.nodes]
+        self.assertEqual((nodes, chain.cpp_instance), reference_parse(chain_str), repr(chain_str))
+
+    def test_typical_chains(self):
+        """Test well-formed chains with and without fields"""
+        for chain_str in [
+            "IVShopItemTemplate:000000029E8DD9C0[true]._nameComp.IVTextQualityComponent:000000029E8D6300[false]",
+            "Root:0A[false].child.Mid:FF[true].x.y.Leaf:1b[false]",
+            "A:1[true]",
+        ]:
+            self.assert_matches_reference(chain_str)
+
+    def test_malformed_nodes_are_fields(self):
+        """Test that parts that are not ClassName:Address[bool] become field names"""
+        for chain_str in [
+            "A:[true].B:1[true]", ":1[true].B:1[true]", "A:1[].B:1[true]", "A:1[tru].B:1[true]",
+            "A:1x[true].B:1[true]", "A:1[true]x.B:1[true]", "A-b:1[true].B:1[true]",
+            "A:1[true]].B:1[true]", "A:1:2[true].B:1[true]", "Bad:zz[true].f.Ok:12[true]",
+        ]:
+            self.assert_matches_reference(chain_str)
+
+    def test_trailing_newline(self):
+        """Test that one trailing newline is tolerated on node parts"""
+        for chain_str in [
+            "A:1[false]\n", "A:1[true].f.B:2[false]\n", "A:1[false]\n.B:2[true]",
+            "A:1[false]\n\n", "A:1[true].f\n",
+        ]:
+            self.assert_matches_reference(chain_str)
+
+    def test_cppinst_suffix(self):
+        """Test __cppinst extraction, including trailing newlines and malformed markers"""
+        for chain_str in [
+            "A:1[false].__cppinst = WBP_MyWidget_C", "A:1[false].__cppinst=X",
+            "A:1[false].__cppinst = X\n", "A:1[false].__cppinst=X\n\n",
+            "A:1[false].__cppinst = X-1", "A:1[false].__cppinst", "A:1[false].__cppinstY = X",
+            "A:1[true].__cppinst = X-1.B:2[false]", "A:1[true].__cppinst.__cppinst = X\n.B:2[true]",
+        ]:
+            self.assert_matches_reference(chain_str)
+
+
+class TestChainNavigation(unittest.TestCase):
+
+    def test_parent_and_children(self):
+        """Test parent/children lookup for nodes of the same chain"""
+        chain = ReferenceChain("A:1[true].f.B:2[false].C:3[false]")
+        a, b, c = chain.nodes
+        self.assertIsNone(chain.get_parent(a))
+        self.assertIs(chain.get_parent(c), b)
+        self.assertEqual(chain.get_children(a), [b, c])
+        self.assertEqual(chain.get_children(c), [])
+
+    def test_node_from_other_chain(self):
+        """Test that nodes of a different chain have no parent or children here"""
+        chain = ReferenceChain("A:1[true].B:2[false]")
+        other = ReferenceChain("X:1[true].Y:2[true].Z:3[false]")
+        self.assertIsNone(chain.get_parent(other.nodes[1]))
+        self.assertIsNone(chain.get_parent(other.nodes[2]))
+        self.assertEqual(chain.get_children(other.nodes[0]), [])
+
+    def test_leak_nodes_not_shared(self):
+        """Test that mutating the returned leak list does not affect the chain"""
+        chain = ReferenceChain("A:1[true].B:2[false]")
+        chain.get_leak_nodes().clear()
+        self.assertIs(chain.get_first_leak(), chain.nodes[1])
+
+
+class TestAnalyze(unittest.TestCase):
+
+    def test_leak_entries(self):
+        """Test priority, children and blueprint info for each leak"""
+        chain = ReferenceChain("A:1[false].f.B:2[true].g.C:3[false].D:4[false].__cppinst = WBP_X_C")
+        analysis = chain.analyze()
+        leaks = analysis["leaks"]
+
+        self.assertEqual(analysis["total_nodes"], 4)
+        self.assertEqual(analysis["leaked_nodes"], 3)
+        self.assertEqual([leak["node"]["class_name"] for leak in leaks], ["A", "C", "D"])
+
+        # Leak at the first node: no parent, so medium priority
+        self.assertIsNone(leaks[0]["parent"])
+        self.assertIsNone(leaks[0]["parent_released"])
+        self.assertEqual(leaks[0]["priority"], "medium")
+        self.assertEqual(leaks[0]["children_count"], 3)
+        self.assertTrue(leaks[0]["has_children"])
+
+        # Released parent: high priority
+        self.assertEqual(leaks[1]["parent"]["class_name"], "B")
+        self.assertTrue(leaks[1]["parent_released"])
+        self.assertEqual(leaks[1]["priority"], "high")
+        self.assertEqual(leaks[1]["children_count"], 1)
+
+        # Leaked parent: medium priority; only the last node carries the blueprint
+        self.assertFalse(leaks[2]["parent_released"])
+        self.assertEqual(leaks[2]["priority"], "medium")
+        self.assertEqual(leaks[2]["children_count"], 0)
+        self.assertFalse(leaks[2]["has_children"])
+        self.assertEqual([leak["cpp_blueprint"] for leak in leaks], [None, None, "WBP_X_C"])
+
+    def test_leak_entries_share_node_dicts(self):
+        """Test that leak entries reference the dicts in the nodes list"""
+        analysis = ReferenceChain("A:1[true].B:2[false].C:3[false]").analyze()
+        nodes = analysis["nodes"]
+        self.assertIs(analysis["leaks"][0]["node"], nodes[1])
+        self.assertIs(analysis["leaks"][0]["parent"], nodes[0])
+        self.assertIs(analysis["leaks"][1]["node"], nodes[2])
+        self.assertIs(analysis["leaks"][1]["parent"], nodes[1])
+
+    def test_without_visualization(self):
+        """Test that the visualization can be skipped"""
+        chain = ReferenceChain("A:1[false]")
+        self.assertIsNone(chain.analyze(include_visualization=False)["visualization"])
+        self.assertIn("NOT RELEASED", chain.analyze()["visualization"])
+
+
+if __name__ == '__main__':
+    unittest.main()